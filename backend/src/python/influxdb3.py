@@ -1,47 +1,104 @@
+import logging
+import queue
+from contextlib import contextmanager
+
 import polars as pl
 from influxdb_client_3 import InfluxDBClient3
 
+logger = logging.getLogger(__name__)
+
+# gRPC channel options for each pooled Flight connection: ping idle
+# channels so they stay open between dashboard requests instead of paying
+# TCP + TLS setup again. gRPC servers reject pings more frequent than every
+# 5 minutes by default (GOAWAY "too_many_pings"), so that is the interval.
+FLIGHT_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 300_000),
+    ("grpc.keepalive_timeout_ms", 20_000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
 class InfluxConnectorV3:
-    def __init__(self, host, token, org, database):
+    def __init__(self, host, token, org, database, pool_size=10):
         """
         Connects to InfluxDB 3.0 (IOx) utilizing Polars for
         zero-copy data handling.
+
+        Keeps a pool of `pool_size` clients so that queries running in
+        parallel worker threads never share a Flight connection.
         """
-        self.client = InfluxDBClient3(
-            host=host,
-            token=token,
-            org=org,
-            database=database
-        )
+        self._pool = queue.Queue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(InfluxDBClient3(
+                host=host,
+                token=token,
+                org=org,
+                database=database,
+                # The client appends its own options to this list, so each
+                # connection gets a copy.
+                flight_client_options={"generic_options": list(FLIGHT_CHANNEL_OPTIONS)},
+            ))
 
-    def get_dataframe(self, sql_query):
+    @contextmanager
+    def connection(self):
         """
-        Executes a SQL query and returns a Polars DataFrame.
+        Borrows a client from the pool, blocking the calling thread
+        until one is free, and returns it when the block exits.
         """
+        client = self._pool.get()
         try:
-            # 1. Fetch data as a PyArrow Table (Native InfluxV3 format)
-            arrow_table = self.client.query(query=sql_query, language="sql")
+            yield client
+        finally:
+            self._pool.put(client)
 
-            # 2. Convert Arrow to Polars
-            # This is extremely fast (zero-copy) compared to Pandas conversion
-            df = pl.from_arrow(arrow_table)
-
-            # Handle cases where result might be None or empty
-            if df is None or df.is_empty():
-                return pl.DataFrame()
+    def read_dataframe(self, sql_query, params=None):
+        """
+        Executes a SQL query, binding `params` to its $placeholders, and
+        returns a Polars DataFrame. Query errors propagate to the caller.
+        """
+        with self.connection() as client:
+            reader = client.query(query=sql_query, language="sql", mode="reader", query_parameters=params)
+            # Convert each batch as it arrives instead of materializing the
+            # whole result as one PyArrow Table first. The chunks are kept
+            # as-is (no rechunk), so no buffer is copied.
+            frames = [pl.from_arrow(batch) for batch in reader]
+            if not frames:
+                # Zero rows still carry the result schema, so an empty
+                # window is told apart from a failed query.
+                frames = [pl.from_arrow(reader.schema.empty_table())]
+        df = pl.concat(frames, how="vertical", rechunk=False)
 
-            # 3. Sort by time
-            # Polars does not have an "Index" like Pandas.
-            # We explicitly sort by time to ensure lines draw correctly.
-            if "time" in df.columns:
-                df = df.sort("time")
+        # Polars does not have an "Index" like Pandas, so rows must be in
+        # time order for lines to draw correctly. Queries that already
+        # ORDER BY time only get flagged as sorted; a real sort would
+        # gather a full copy of every column.
+        if "time" in df.columns:
+            df = df.set_sorted("time") if df["time"].is_sorted() else df.sort("time")
+        return df
 
-            return df
+    def get_dataframe(self, sql_query, lazy=True, params=None):
+        """
+        Executes a SQL query and returns a Polars LazyFrame, or an
+        eager DataFrame when lazy=False. `params` are bound server-side
+        to the query's $placeholders.
 
+        A query that succeeds with no rows returns an empty frame that
+        keeps the result's columns; a failed query returns None.
+        """
+        try:
+            # 1. Stream the Arrow batches (Native InfluxV3 format) into Polars
+            # This is extremely fast (zero-copy) compared to Pandas conversion
+            df = self.read_dataframe(sql_query, params)
         except Exception as e:
             # Catch connectivity issues or bad SQL syntax
-            print(f"Query failed: {e}")
-            return pl.DataFrame()
+            logger.error("Query failed: %s", e)
+            return None
+
+        # 2. Results arrive sorted by time; callers
+        # extend the lazy plan and collect once so Polars can optimize
+        # the whole pipeline.
+        return df.lazy() if lazy else df
 
     def close(self):
-        self.client.close()
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
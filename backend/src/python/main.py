@@ -1,9 +1,18 @@
+import asyncio
+import io
+import json
 import os
 import polars as pl
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
 from datetime import date, datetime, timedelta, time, timezone
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
-from fastapi import FastAPI, Query, Body
+from fastapi import FastAPI, Query, Body, Header, Depends
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from cachetools import TTLCache
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional, Tuple
 import logging
@@ -11,31 +20,64 @@ import sys
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 from influxdb3 import InfluxConnectorV3
 
 # --- Configuration ---
+TIMEZONE = "America/New_York"
+NY_TZ = ZoneInfo(TIMEZONE)
 INFLUX_HOST = os.getenv("INFLUX_HOST")
 INFLUX_TOKEN = os.getenv("INFLUX_TOKEN")
 INFLUX_ORG = os.getenv("INFLUX_ORG")
 INFLUX_DATABASE = os.getenv("INFLUX_DATABASE")
+INFLUX_POOL_SIZE = int(os.getenv("INFLUX_POOL_SIZE", "10"))
 
 # --- InfluxDB Client ---
 db = None
-if INFLUX_HOST and INFLUX_TOKEN and INFLUX_ORG and INFLUX_DATABASE:
-    try:
-        logging.info("Initializing InfluxDB client...")
-        db = InfluxConnectorV3(host=INFLUX_HOST, token=INFLUX_TOKEN, org=INFLUX_ORG, database=INFLUX_DATABASE)
-        logging.info("InfluxDB client initialized successfully.")
-    except Exception as e:
-        logging.error(f"Failed to initialize InfluxDB client: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global db
+    if INFLUX_HOST and INFLUX_TOKEN and INFLUX_ORG and INFLUX_DATABASE:
+        try:
+            logger.info("Initializing InfluxDB client pool...")
+            db = InfluxConnectorV3(host=INFLUX_HOST, token=INFLUX_TOKEN, org=INFLUX_ORG, database=INFLUX_DATABASE,
+                                   pool_size=INFLUX_POOL_SIZE)
+            logger.info("InfluxDB client pool initialized successfully (%d clients).", INFLUX_POOL_SIZE)
+        except Exception as e:
+            logger.error("Failed to initialize InfluxDB client: %s", e)
+            sys.exit(1)
+    else:
+        logger.warning("InfluxDB environment variables not set. Cannot initialize InfluxDB client.")
+
+    if db is None:
+        logger.error("InfluxDB client is not initialized. Exiting.")
         sys.exit(1)
-else:
-    logging.warning("InfluxDB environment variables not set. Cannot initialize InfluxDB client.")
 
-if db is None:
-    logging.error("InfluxDB client is not initialized. Exiting.")
-    sys.exit(1)
+    yield
+
+    db.close()
+
+
+# Set by `cached` around each endpoint call; fetch records failed queries
+# in it so a response built from a failure is never cached.
+query_failures: ContextVar[Optional[List[str]]] = ContextVar("query_failures", default=None)
+
+async def fetch(sql_query: str, params: Optional[Dict[str, str]] = None) -> pl.LazyFrame:
+    """
+    Runs a query on Starlette's worker threadpool so the blocking Flight
+    call never stalls the event loop. Sharing the threadpool FastAPI uses
+    for sync dependencies keeps all blocking work under one limiter.
+    A failed query yields an empty LazyFrame with no columns.
+    """
+    df = await run_in_threadpool(db.get_dataframe, sql_query, params=params)
+    if df is None:
+        failures = query_failures.get()
+        if failures is not None:
+            failures.append(sql_query)
+        return pl.LazyFrame()
+    return df
 
 
 # --- FastAPI App ---
@@ -43,6 +85,7 @@ app = FastAPI(
     title="VitalStream API",
     description="API for the VitalStream Health Dashboard, using FastAPI and InfluxDB.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --- Pydantic Models ---
@@ -93,15 +136,15 @@ class WorkoutResponse(BaseModel):
     duration: int
     calories: int
     type: str
-    avgHr: int
+    avgHr: Optional[int]
 
 class DietaryTrendResponse(BaseModel):
     date: str
     calories: int
-    protein: int
-    carbs: int
-    fat: int
-    trend: int
+    protein: Optional[int]
+    carbs: Optional[int]
+    fat: Optional[int]
+    trend: Optional[int]
 
 class MealResponse(BaseModel):
     name: str
@@ -113,19 +156,303 @@ class BodyCompositionResponse(BaseModel):
     weight: float
     bodyFat: float
 
+# --- Polars Expressions ---
+# Built once at import; expressions are immutable, so every request just
+# attaches them to its own LazyFrame instead of rebuilding the tree.
+
+SHORT_DATE = '%h %e'
+
+HR_COLUMNS = [
+    pl.col('time').dt.convert_time_zone(TIMEZONE).dt.strftime('%H:%M'),
+    pl.col('avg').alias('value'),
+]
+
+BP_CATEGORIES = ["Normal", "Elevated", "Hypertension Stage 1", "Hypertension Stage 2", "Hypertensive Crisis"]
+
+# Each reading scores a 0-4 rank by counting the thresholds it reaches
+# (diastolic skips "Elevated", so reaching 80 counts twice); the worse of
+# the two ranks indexes the category. No per-row branching or strings.
+SYSTOLIC_RANK = pl.sum_horizontal(
+    pl.col("systolic") >= 120, pl.col("systolic") >= 130, pl.col("systolic") >= 140, pl.col("systolic") > 180
+)
+DIASTOLIC_RANK = (
+    (pl.col("diastolic") >= 80).cast(pl.UInt32) * 2 + (pl.col("diastolic") >= 90) + (pl.col("diastolic") > 120)
+)
+BP_CATEGORY = pl.max_horizontal(SYSTOLIC_RANK, DIASTOLIC_RANK).replace_strict(
+    list(range(len(BP_CATEGORIES))), BP_CATEGORIES, return_dtype=pl.Categorical
+).alias("category")
+
+# Responses skip Pydantic, so readings are rounded to the whole mmHg the
+# model publishes before classification; the category then agrees with the
+# numbers sent alongside it.
+BP_READINGS = pl.col(['systolic', 'diastolic']).round().cast(pl.Int64)
+BP_COLUMNS = [pl.col('time').dt.strftime(SHORT_DATE), 'systolic', 'diastolic', BP_CATEGORY]
+
+# Whole mg/dL, matching GlucoseResponse.
+GLUCOSE_COLUMNS = [pl.col('time').dt.strftime(SHORT_DATE), pl.col('qty').round().cast(pl.Int64).alias('value')]
+
+SLEEP_COLUMNS = [
+    pl.col('time').dt.strftime(SHORT_DATE).alias('date'),
+    pl.col('totalSleep').alias('totalDuration'),
+    pl.col('deep').alias('deepSleep'),
+    pl.col('rem').alias('remSleep'),
+    pl.col('core').alias('lightSleep'),
+    'awake',
+    pl.lit(95.0).alias('efficiency'),
+]
+
+WORKOUT_COLUMNS = [
+    pl.col('workout_id').alias('id'),
+    pl.col('time').dt.strftime('%Y-%m-%d %H:%M'),
+    pl.col('workout_name').alias('name'),
+    # Whole seconds to whole minutes in integer arithmetic; the cast is a
+    # no-op when duration is already stored as an integer.
+    pl.col('duration').cast(pl.Int64) // 60,
+    pl.col('active_energy_value').cast(pl.Int64).alias('calories'),
+    pl.col('workout_name').alias('type'),
+    pl.col('avg').cast(pl.Int64).alias('avgHr'),
+]
+
+DIETARY_TREND = pl.col('trend').rolling_mean(window_size=7, min_samples=3)
+DIETARY_COLUMNS = [
+    pl.col('day').dt.strftime(SHORT_DATE).alias('date'),
+    pl.col(['calories', 'protein', 'carbs', 'fat']).cast(pl.Int64),
+    pl.col('trend').cast(pl.Int64).fill_null(strategy='forward'),
+]
+
+BODY_COLUMNS = [pl.col('time').dt.strftime(SHORT_DATE), 'weight', 'bodyFat']
+
+# --- SQL Queries ---
+# Static query text with $placeholders for the time bounds, so every
+# request sends byte-identical SQL and only the bound parameters change.
+
+SUMMARY_TOTALS_SQL = """
+SELECT metric, first_value(value ORDER BY time ASC) AS value
+FROM "daily_totals"
+WHERE time >= $since AND time < $until
+  AND (
+    (metric IN ('step_count', 'active_energy', 'basal_energy_burned') AND source = 'RingConn')
+    OR metric = 'walking_running_distance'
+  )
+GROUP BY metric
+"""
+
+SUMMARY_CALORIES_SQL = """
+SELECT sum(qty) AS qty
+FROM "dietary_energy"
+WHERE time >= $since AND time < $until
+"""
+
+# InfluxDB bins the readings into 10-minute buckets server-side.
+HR_SQL = """
+SELECT date_bin(INTERVAL '10 minutes', time) AS time, avg("avg") AS "avg"
+FROM "heart_rate"
+WHERE time > now() - interval '1d'
+GROUP BY 1
+ORDER BY 1
+"""
+
+BP_SQL = """
+SELECT time, systolic, diastolic
+FROM "blood_pressure"
+WHERE time > $since and time <= $until
+ORDER BY time ASC
+"""
+
+GLUCOSE_SQL = """
+SELECT time, qty
+FROM "blood_glucose"
+WHERE time > $since and time <= $until
+ORDER BY time ASC
+"""
+
+SLEEP_SQL = """
+SELECT time, "totalSleep", deep, rem, core, awake
+FROM "sleep_analysis"
+WHERE time > $since and time <= $until
+ORDER BY time ASC
+"""
+
+# Workout heart rate is averaged per workout and joined in InfluxDB, so
+# each workout comes back as a single row with its average already attached.
+WORKOUT_SQL = """
+SELECT w.time, w.workout_id, w.workout_name, w.duration, w.active_energy_value, hr."avg"
+FROM "workout" w
+LEFT JOIN (
+  SELECT workout_id, avg("avg") AS "avg"
+  FROM "workout_heart_rate"
+  WHERE time > $since and time <= $until
+  GROUP BY workout_id
+) hr ON w.workout_id = hr.workout_id
+WHERE w.time > $since and w.time <= $until
+ORDER BY w.time ASC
+"""
+
+# Fallback when the joined query fails (e.g. workout_heart_rate does not
+# exist yet): the same columns with no heart-rate average.
+WORKOUT_ONLY_SQL = """
+SELECT time, workout_id, workout_name, duration, active_energy_value, CAST(NULL AS DOUBLE) AS "avg"
+FROM "workout"
+WHERE time > $since and time <= $until
+ORDER BY time ASC
+"""
+
+# One round trip: every nutrient is summed per local day in the database,
+# tagged with its `kind` and unioned, then pivoted back into one column per
+# nutrient. The nutrient kinds share the reporting window's $since; the
+# trend reads a longer window of dietary energy from $trend_since.
+DIETARY_MEASUREMENTS = {
+    'calories': 'dietary_energy',
+    'protein': 'protein',
+    'carbs': 'carbohydrates',
+    'fat': 'total_fat',
+    'trend': 'dietary_energy',
+}
+DIETARY_SQL = "UNION ALL".join(
+    f"""
+SELECT date_trunc('day', tz(time, '{TIMEZONE}')) AS day, '{name}' AS kind, sum(qty) AS qty
+FROM "{measurement}"
+WHERE time > ${'trend_since' if name == 'trend' else 'since'} and time <= $until
+GROUP BY 1
+"""
+    for name, measurement in DIETARY_MEASUREMENTS.items()
+)
+
+WEIGHT_SQL = """
+SELECT time, qty
+FROM "weight_body_mass"
+WHERE time > $since and time <= $until
+ORDER BY time ASC
+"""
+
+BODY_FAT_SQL = """
+SELECT time, qty
+FROM "body_fat_percentage"
+WHERE time > $since and time <= $until
+ORDER BY time ASC
+"""
+
 # --- helper functions ---
 
-def get_day(d: date) -> Tuple[str, str]:
-    tz = ZoneInfo("America/New_York")
-    if type(d) == str:
-        d = datetime.strptime(d, '%Y-%m-%d').date()
-    start_local = datetime.combine(d, time(0, 0), tzinfo=tz)
+def get_day(d: Optional[date] = None) -> Tuple[str, str]:
+    """
+    Returns the UTC ISO bounds of local day `d` (today when omitted).
+    FastAPI has already parsed `date` query parameters, so no string
+    handling is needed here.
+    """
+    d = d or datetime.now(NY_TZ).date()
+    start_local = datetime.combine(d, time(0, 0), tzinfo=NY_TZ)
     end_local = start_local + timedelta(days=1)
 
     start_utc = start_local.astimezone(timezone.utc).isoformat()
     end_utc = end_local.astimezone(timezone.utc).isoformat()
     return start_utc, end_utc
 
+def get_window(days: int, end_date: Optional[date] = None) -> Tuple[str, str]:
+    """
+    Returns the (since, until) ISO bounds of a `days`-long query window
+    ending now, starting `days` before `end_date` when one is given.
+
+    Bounds are snapped to the minute so _minute_window can memoize them
+    and every request within a minute binds identical parameters. Both are
+    UTC RFC3339 strings, so InfluxDB compares them to `time` as-is.
+    """
+    return _minute_window(days, end_date, datetime.now(NY_TZ).replace(second=0, microsecond=0))
+
+@lru_cache(maxsize=128)
+def _minute_window(days: int, end_date: Optional[date], minute: datetime) -> Tuple[str, str]:
+    until = minute + timedelta(minutes=1)
+    if end_date:
+        since = datetime.combine(end_date - timedelta(days=days), time(0, 0), tzinfo=timezone.utc)
+    else:
+        since = minute - timedelta(days=days)
+    return since.astimezone(timezone.utc).isoformat(), until.astimezone(timezone.utc).isoformat()
+
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+async def wants_arrow(accept: Optional[str] = Header(None)) -> bool:
+    """
+    Declared async so FastAPI resolves it on the event loop instead of
+    hopping to the threadpool on every request, cache hits included.
+    """
+    return accept is not None and ARROW_STREAM in accept
+
+def arrow_response(df: pl.DataFrame) -> Response:
+    """
+    Serializes a DataFrame as an Arrow IPC stream, skipping the per-row
+    Python dicts and Pydantic validation of the JSON path.
+    """
+    sink = io.BytesIO()
+    # The oldest compat level sends large_utf8 / dictionary<large_utf8> instead of
+    # string_view, which Arrow JS and most other IPC readers cannot decode.
+    df.write_ipc_stream(sink, compat_level=pl.CompatLevel.oldest())
+    return Response(content=sink.getvalue(), media_type=ARROW_STREAM)
+
+def json_response(df: pl.DataFrame) -> Response:
+    """
+    Serializes a DataFrame as a JSON array of row objects with Polars'
+    native writer, so no per-row Python dicts are built. Writing into a
+    buffer hands over the UTF-8 bytes as-is instead of decoding them to
+    a str that Response would immediately encode again.
+    """
+    sink = io.BytesIO()
+    df.write_json(sink)
+    return Response(content=sink.getvalue(), media_type="application/json")
+
+def respond(df: pl.DataFrame, arrow: bool) -> Response:
+    return arrow_response(df) if arrow else json_response(df)
+
+_MISSING = object()
+
+def cached(ttl: float, maxsize: int = 64):
+    """
+    Caches an endpoint's response for `ttl` seconds per set of arguments.
+    Concurrent misses on the same key wait on one computation instead of
+    each re-running the queries and the Polars pipeline. Responses built
+    while any query failed are returned but not cached.
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Per-key lock plus the number of requests holding or queued on it;
+        # the entry is dropped only once nobody is left, so a new arrival
+        # never gets a second lock while others still wait on the first.
+        locks: Dict[Any, Tuple[asyncio.Lock, int]] = {}
+
+        @wraps(func)
+        async def wrapper(**kwargs):
+            key = tuple(sorted(kwargs.items()))
+            # One lookup per check: with a TTLCache, `key in cache` followed
+            # by `cache[key]` can straddle an expiry and raise KeyError.
+            result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+            lock, waiters = locks.get(key, (None, 0))
+            lock = lock or asyncio.Lock()
+            locks[key] = (lock, waiters + 1)
+            try:
+                async with lock:
+                    result = cache.get(key, _MISSING)
+                    if result is _MISSING:
+                        failures: List[str] = []
+                        token = query_failures.set(failures)
+                        try:
+                            result = await func(**kwargs)
+                        finally:
+                            query_failures.reset(token)
+                        if not failures:
+                            cache[key] = result
+            finally:
+                lock, waiters = locks[key]
+                if waiters == 1:
+                    del locks[key]
+                else:
+                    locks[key] = (lock, waiters - 1)
+            return result
+
+        return wrapper
+    return decorator
+
 
 # --- API Endpoints ---
 
@@ -142,43 +469,24 @@ async def ingest_data(data: IngestData = Body(...)):
     return {"message": "Data ingestion started."}
 
 @app.get("/api/v1/summary", response_model=SummaryResponse)
+@cached(ttl=30)
 async def get_summary(date: Optional[date] = Query(None)):
-    start, end = get_day(date)
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "daily_totals"
-    WHERE time >= '{start}' AND time < '{end}'
-    ORDER BY time ASC
-    """
-    df = db.get_dataframe(sql_query)
-
-    df = df.with_columns(pl.col('date').str.to_date('%Y-%m-%d'))#.filter(pl.col('date').eq(today))
-
-    steps_query = df.filter((pl.col('metric')=='step_count') & (pl.col('source')=='RingConn')).select('value')
-    distance_query = df.filter((pl.col('metric')=='walking_running_distance')).select('value')
-    act_cal_query = df.filter((pl.col('metric')=='active_energy') & (pl.col('source')=='RingConn')).select('value')
-    b_cal_query = df.filter((pl.col('metric')=='basal_energy_burned') & (pl.col('source')=='RingConn')).select('value')
+    since, until = get_day(date)
 
+    params = {'since': since, 'until': until}
+    df, df2 = await asyncio.gather(fetch(SUMMARY_TOTALS_SQL, params), fetch(SUMMARY_CALORIES_SQL, params))
 
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "dietary_energy"
-    WHERE time >= '{start}' AND time < '{end}'
-    ORDER BY time ASC
-    """
-
-    df2 = db.get_dataframe(sql_query)
-    if not df2.is_empty():
-        calories_query = df2.select(['qty']).sum()
+    # Filtering and the first-value-per-metric reduction already ran in
+    # InfluxDB, so at most one row per metric comes back.
+    if not (df.collect_schema() and df2.collect_schema()):
+        logger.warning("query failed for summary, reporting zeros for missing data...date=%s", date)
+    totals = dict(df.collect().iter_rows()) if df.collect_schema() else {}
+    calories = df2.select(pl.col('qty').sum()).collect().item() if df2.collect_schema() else 0.0
 
-    steps = 0.0 if steps_query.is_empty() else steps_query[0,0]
-    distance = 0.0 if distance_query.is_empty() else distance_query[0,0]
-    act_cal = 0.0 if act_cal_query.is_empty() else act_cal_query[0,0]
-    b_cal = 0.0 if b_cal_query.is_empty() else b_cal_query[0,0]
-    calories = 0.0 if df2.is_empty() else calories_query[0,0]
+    steps = totals.get('step_count', 0.0)
+    distance = totals.get('walking_running_distance', 0.0)
+    act_cal = totals.get('active_energy', 0.0)
+    b_cal = totals.get('basal_energy_burned', 0.0)
 
 
     # Make response
@@ -193,398 +501,139 @@ async def get_summary(date: Optional[date] = Query(None)):
 
     return response
 
-@app.get("/api/v1/vitals/hr", response_model=List[HeartRateResponse])
-async def get_heart_rate(date: Optional[date] = Query(None)):
-    today = datetime.now(ZoneInfo("America/New_York"))
-    start = today.isoformat()
-    if not date:
-        end = (today - timedelta(days=30)).isoformat()
-    else:
-        if type(date) == str:
-            end = (datetime.strptime(date, '%Y-%m-%d')- timedelta(days=30)).isoformat()
-        else:
-            try:
-                end = (date - timedelta(days=30)).isoformat()
-            except Exception as e:
-                raise(e)
-    # SQL Query
-    sql_query = """
-    SELECT *
-    FROM "heart_rate"
-    WHERE time > now() - interval '1d'
-    ORDER BY time ASC
-    """
-
-    today = datetime.now(ZoneInfo("America/New_York")).date()
-    df = db.get_dataframe(sql_query)
-
-    df = df.with_columns(
-        pl.col("time")
-        .dt.replace_time_zone("UTC")
-        .dt.convert_time_zone("America/New_York")
-        .dt.replace_time_zone(None)
-    )
-
-    df = df.group_by_dynamic("time", every="10m").agg(
-        pl.col("avg").mean(),
-        pl.col("max").max(),
-        pl.col("min").min(),
-    )
-
-    result = df.select(['time', 'avg']).with_columns(pl.col('time').dt.strftime('%H:%M')).rename({'avg':'value'}).to_dicts()
-
-    return result
-
-@app.get("/api/v1/vitals/bp", response_model=List[BloodPressureResponse])
-async def get_blood_pressure(end_date: Optional[date] = Query(None)):
-    today = datetime.now(ZoneInfo("America/New_York"))
-    start = today.isoformat()
-    if not end_date:
-        end = (today - timedelta(days=30)).isoformat()
-    else:
-        if type(end_date) == str:
-            end = (datetime.strptime(end_date, '%Y-%m-%d')- timedelta(days=30)).isoformat()
-        else:
-            try:
-                end = (end_date - timedelta(days=30)).isoformat()
-            except Exception as e:
-                raise(e)
-
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "blood_pressure"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df = db.get_dataframe(sql_query)
-    if df.is_empty():
-        logging.info(f"no data returned for blood_pressure...end_date={end_date}")
-        return []
-    df = df.with_columns(
-        pl.when((pl.col("systolic") > 180) | (pl.col("diastolic") > 120))
-        .then(pl.lit("Hypertensive Crisis"))
-        .when((pl.col("systolic") >= 140) | (pl.col("diastolic") >= 90))
-        .then(pl.lit("Hypertension Stage 2"))
-        .when((pl.col("systolic") >= 130) | (pl.col("diastolic") >= 80))
-        .then(pl.lit("Hypertension Stage 1"))
-        .when((pl.col("systolic") >= 120) & (pl.col("diastolic") < 80))
-        .then(pl.lit("Elevated"))
-        .otherwise(pl.lit("Normal"))
-        .cast(pl.Categorical)
-        .alias("category")
+@app.get("/api/v1/vitals/hr", responses={200: {"model": List[HeartRateResponse]}})
+@cached(ttl=30)
+async def get_heart_rate(date: Optional[date] = Query(None), arrow: bool = Depends(wants_arrow)):
+    df = await fetch(HR_SQL)
+    if not df.collect_schema():
+        logger.warning("query failed for heart_rate, returning no data...date=%s", date)
+        return respond(pl.DataFrame(), arrow)
+
+    result = df.select(HR_COLUMNS).collect(engine='streaming')
+
+    return respond(result, arrow)
+
+@app.get("/api/v1/vitals/bp", responses={200: {"model": List[BloodPressureResponse]}})
+@cached(ttl=300)
+async def get_blood_pressure(end_date: Optional[date] = Query(None), arrow: bool = Depends(wants_arrow)):
+    since, until = get_window(30, end_date)
+
+    df = await fetch(BP_SQL, {'since': since, 'until': until})
+    if not df.collect_schema():
+        logger.warning("query failed for blood_pressure, returning no data...end_date=%s", end_date)
+        return respond(pl.DataFrame(), arrow)
+    result = df.with_columns(BP_READINGS).select(BP_COLUMNS).collect(engine='streaming')
+
+    return respond(result, arrow)
+
+@app.get("/api/v1/vitals/glucose", responses={200: {"model": List[GlucoseResponse]}})
+@cached(ttl=300)
+async def get_glucose(end_date: Optional[date] = Query(None), arrow: bool = Depends(wants_arrow)):
+    since, until = get_window(30, end_date)
+
+    logger.debug("glucose window since=%s until=%s", since, until)
+
+    df = await fetch(GLUCOSE_SQL, {'since': since, 'until': until})
+    if not df.collect_schema():
+        logger.warning("query failed for blood_glucose, returning no data...end_date=%s", end_date)
+        return respond(pl.DataFrame(), arrow)
+    result = df.select(GLUCOSE_COLUMNS).collect(engine='streaming')
+
+    return respond(result, arrow)
+
+@app.get("/api/v1/sleep", responses={200: {"model": List[SleepResponse]}})
+@cached(ttl=300)
+async def get_sleep(end_date: Optional[date] = Query(None), arrow: bool = Depends(wants_arrow)):
+    since, until = get_window(7, end_date)
+
+    df = await fetch(SLEEP_SQL, {'since': since, 'until': until})
+    if not df.collect_schema():
+        logger.warning("query failed for sleep_analysis, returning no data...end_date=%s", end_date)
+        return respond(pl.DataFrame(), arrow)
+    result = df.select(SLEEP_COLUMNS).collect(engine='streaming')
+
+    return respond(result, arrow)
+
+@app.get("/api/v1/workouts", responses={200: {"model": List[WorkoutResponse]}})
+@cached(ttl=300)
+async def get_workouts(date: Optional[date] = Query(None), arrow: bool = Depends(wants_arrow)):
+    since, until = get_window(30 if date else 90, date)
+
+    params = {'since': since, 'until': until}
+    df = await fetch(WORKOUT_SQL, params)
+    if not df.collect_schema():
+        # A missing or failing workout_heart_rate must not hide the workouts.
+        logger.warning("query failed for workout heart rate join, retrying without it...end_date=%s", date)
+        df = await fetch(WORKOUT_ONLY_SQL, params)
+    if not df.collect_schema():
+        logger.warning("query failed for workout, returning no data...end_date=%s", date)
+        return respond(pl.DataFrame(), arrow)
+    result = df.select(WORKOUT_COLUMNS).collect(engine='streaming')
+
+
+    return respond(result, arrow)
+
+@app.get("/api/v1/dietary/trends", responses={200: {"model": List[DietaryTrendResponse]}})
+@cached(ttl=3600)
+async def get_dietary_trends(end_date: Optional[date] = Query(None), arrow: bool = Depends(wants_arrow)):
+    since, until = get_window(30, end_date)
+    trend_since, _ = get_window(37, end_date)
+
+    params = {'since': since, 'trend_since': trend_since, 'until': until}
+
+    df = await fetch(DIETARY_SQL, params)
+    if not df.collect_schema():
+        logger.warning("query failed for dietary info, returning no data...end_date=%s", end_date)
+        return respond(pl.DataFrame(), arrow)
+
+    # Pivot lazily: one row per day with a column per nutrient (null when
+    # that nutrient has no entry that day), so the whole pipeline below
+    # runs as a single plan with one collect.
+    df = df.group_by('day').agg(
+        pl.col('qty').filter(pl.col('kind') == name).first().alias(name) for name in DIETARY_MEASUREMENTS
     )
-    result = df.with_columns(pl.col('time').dt.strftime('%h %e')).select(['time', 'systolic', 'diastolic', 'category']).to_dicts()
-
-    return result
-
-@app.get("/api/v1/vitals/glucose", response_model=List[GlucoseResponse])
-async def get_glucose(end_date: Optional[date] = Query(None)):
-    today = datetime.now(ZoneInfo("America/New_York"))
-    start = today.isoformat()
-    if not end_date:
-        end = (today - timedelta(days=30)).isoformat()
-    else:
-        if type(end_date) == str:
-            end = (datetime.strptime(end_date, '%Y-%m-%d')- timedelta(days=30)).isoformat()
-        else:
-            try:
-                end = (end_date - timedelta(days=30)).isoformat()
-            except Exception as e:
-                raise(e)
-
-    # print (f'start = {start}; end = {end}')
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "blood_glucose"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df = db.get_dataframe(sql_query)
-    if df.is_empty():
-        logging.info(f"no data returned for blood_glucose...end_date={end_date}")
-        return []
-    result = df.with_columns(pl.col('time').dt.strftime('%h %e')).rename({'qty':'value'}).select(['time', 'value']).to_dicts()
-
-    return result
-
-@app.get("/api/v1/sleep", response_model=List[SleepResponse])
-async def get_sleep(end_date: Optional[date] = Query(None)):
-    today = datetime.now(ZoneInfo("America/New_York"))
-    start = today.isoformat()
-    if not end_date:
-        end = (today - timedelta(days=7)).isoformat()
-    else:
-        if type(end_date) == str:
-            end = (datetime.strptime(end_date, '%Y-%m-%d')- timedelta(days=7)).isoformat()
-        else:
-            try:
-                end = (end_date - timedelta(days=7)).isoformat()
-            except Exception as e:
-                raise(e)
-
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "sleep_analysis"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df = db.get_dataframe(sql_query)
-    if df.is_empty():
-        logging.info(f"no data returned for sleep_analysis...end_date={end_date}")
-        return []
-    result = df.rename({'time':'date', 'totalSleep':'totalDuration', 'deep':'deepSleep', 'rem':'remSleep', 'core':'lightSleep'}) \
-    .select(['date', 'totalDuration', 'deepSleep', 'remSleep', 'lightSleep', 'awake']).with_columns(
-        pl.col('date').dt.strftime('%h %e'),
-        pl.lit(95).alias('efficiency')
-    ).to_dicts()
-
-    return result
-
-@app.get("/api/v1/workouts", response_model=List[WorkoutResponse])
-async def get_workouts(date: Optional[date] = Query(None)):
-    today = datetime.now(ZoneInfo("America/New_York"))
-    start = today.isoformat()
-    if not date:
-        end = (today - timedelta(days=90)).isoformat()
-    else:
-        if type(date) == str:
-            end = (datetime.strptime(date, '%Y-%m-%d')- timedelta(days=30)).isoformat()
-        else:
-            try:
-                end = (date - timedelta(days=30)).isoformat()
-            except Exception as e:
-                raise(e)
-
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "workout"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df = db.get_dataframe(sql_query)
-    if df.is_empty():
-        logging.info(f"no data returned for workout...end_date = {date}")
-        return []
-    df = df.select(['workout_id', 'time', 'workout_name', 'duration', 'active_energy_value']).with_columns(
-        pl.col('workout_name').alias('type'),
-        (pl.col('duration') / 60).cast(pl.Int64),
-        pl.col('active_energy_value').cast(pl.Int64),
-    )
-
-    # Heart Rate
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "workout_heart_rate"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df2 = db.get_dataframe(sql_query)
-    df2 = df2.group_by('workout_id').agg(pl.col('avg').mean().cast(pl.Int64))
-    result = df.join(df2, on='workout_id', how='left').with_columns(
-        pl.col('time').dt.strftime('%Y-%m-%d %H:%M')
-    ).rename({'workout_name':'name', 'active_energy_value':'calories', 'avg':'avgHr'}).to_dicts()
-
-
-    return result
-
-@app.get("/api/v1/dietary/trends", response_model=List[DietaryTrendResponse])
-async def get_dietary_trends(end_date: Optional[date] = Query(None)):
-    today = datetime.now(ZoneInfo("America/New_York"))
-    start = today.isoformat()
-    if not end_date:
-        end = (today - timedelta(days=30)).isoformat()
-        tend = (today - timedelta(days=37)).isoformat()
-    else:
-        if type(end_date) == str:
-            end = (datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=30)).isoformat()
-            tend = (datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=37)).isoformat()
-        else:
-            try:
-                end = (end_date - timedelta(days=30)).isoformat()
-                tend = (end_date - timedelta(days=37)).isoformat()
-            except Exception as e:
-                raise(e)
-
-    #---------------------
-    # Calories
-    #---------------------
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "dietary_energy"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df = db.get_dataframe(sql_query)
-    if df.is_empty():
-        logging.info(f"no data returned for dietary info...end_date={end_date}")
-        return []
-    df = df.with_columns(
-        pl.col('time').dt.convert_time_zone(time_zone="America/New_York")
-    ).with_columns(
-        pl.col('time').dt.strftime('%Y-%m-%d').alias('day')
-    ).group_by('day').agg(pl.col('qty').sum().cast(pl.Int64).alias('calories')).sort('day')
-
-    #---------------------
-    # Protein
-    #---------------------
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "protein"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df2 = db.get_dataframe(sql_query)
-    df2 = df2.with_columns(
-        pl.col('time').dt.convert_time_zone(time_zone="America/New_York")
-    ).with_columns(
-        pl.col('time').dt.strftime('%Y-%m-%d').alias('day')
-    ).group_by('day').agg(pl.col('qty').sum().cast(pl.Int64).alias('protein')).sort('day')
-
-    #---------------------
-    # Carbs
-    #---------------------
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "carbohydrates"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df3 = db.get_dataframe(sql_query)
-    df3 = df3.with_columns(
-        pl.col('time').dt.convert_time_zone(time_zone="America/New_York")
-    ).with_columns(
-        pl.col('time').dt.strftime('%Y-%m-%d').alias('day')
-    ).group_by('day').agg(pl.col('qty').sum().cast(pl.Int64).alias('carbs')).sort('day')
-
-    #---------------------
-    # Fat
-    #---------------------
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "total_fat"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df4 = db.get_dataframe(sql_query)
-    df4 = df4.with_columns(
-        pl.col('time').dt.convert_time_zone(time_zone="America/New_York")
-    ).with_columns(
-        pl.col('time').dt.strftime('%Y-%m-%d').alias('day')
-    ).group_by('day').agg(pl.col('qty').sum().cast(pl.Int64).alias('fat')).sort('day')
 
     #---------------------
     # Trend
     #---------------------
+    # The trend window starts a week earlier, so roll over every day that has
+    # dietary energy before trimming to the days being reported.
+    result = df.filter(pl.col('trend').is_not_null()).sort('day').with_columns(
+        DIETARY_TREND
+    ).filter(pl.col('calories').is_not_null()).select(DIETARY_COLUMNS).collect(engine='streaming')
 
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "dietary_energy"
-    WHERE time > '{tend}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df5 = db.get_dataframe(sql_query)
-    df5 = df5.with_columns(
-        pl.col('time').dt.convert_time_zone(time_zone="America/New_York")
-    ).with_columns(
-        pl.col('time').dt.strftime('%Y-%m-%d').alias('day')
-    ).group_by('day').agg(pl.col('qty').sum().alias('trend')).with_columns(
-        pl.col('trend').rolling_mean(window_size=7, min_samples=3).cast(pl.Int64)
-    ).sort('day')
-
-    ### Combine all ####
-    df = df.join(df2, on='day', how='left').join(df3, on='day', how='left').join(df4, on='day', how='left').join(df5, on='day', how='left')
-    result = df.with_columns(
-        pl.col('day').str.to_datetime('%Y-%m-%d').dt.strftime('%h %e'),
-        pl.col('trend').fill_null(strategy='forward')
-    ).rename({'day':'date'}).to_dicts()
-
-    return result
-
-@app.get("/api/v1/dietary/meals/today", response_model=List[MealResponse])
-async def get_meals_today(date: Optional[date] = Query(None)):
-    return [
-        { "name": "Breakfast", "desc": "Oatmeal, Berries, Whey", "cal": 420 },
-        { "name": "Lunch", "desc": "Chicken Salad, Quinoa", "cal": 580 }
-    ]
-
-@app.get("/api/v1/body/composition", response_model=List[BodyCompositionResponse])
-async def get_body_composition(end_date: Optional[date] = Query(None)):
-    today = datetime.now(ZoneInfo("America/New_York"))
-    start = today.isoformat()
-    if not end_date:
-        end = (today - timedelta(days=30)).isoformat()
-    else:
-        if type(end_date) == str:
-            end = (datetime.strptime(end_date, '%Y-%m-%d')- timedelta(days=30)).isoformat()
-        else:
-            try:
-                end = (end_date - timedelta(days=30)).isoformat()
-            except Exception as e:
-                raise(e)
+    return respond(result, arrow)
 
-    #---------------------
-    # Weight
-    #---------------------
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "weight_body_mass"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
+# Static for now, so the JSON body is encoded once at import.
+MEALS_TODAY_JSON = json.dumps([
+    { "name": "Breakfast", "desc": "Oatmeal, Berries, Whey", "cal": 420 },
+    { "name": "Lunch", "desc": "Chicken Salad, Quinoa", "cal": 580 }
+]).encode()
 
-    df = db.get_dataframe(sql_query)
-    if df.is_empty():
-        logging.info(f"no data returned for body composition...end_date={end_date}")
-        return []
+@app.get("/api/v1/dietary/meals/today", responses={200: {"model": List[MealResponse]}})
+async def get_meals_today(date: Optional[date] = Query(None)):
+    return Response(content=MEALS_TODAY_JSON, media_type="application/json")
+
+@app.get("/api/v1/body/composition", responses={200: {"model": List[BodyCompositionResponse]}})
+@cached(ttl=300)
+async def get_body_composition(end_date: Optional[date] = Query(None), arrow: bool = Depends(wants_arrow)):
+    since, until = get_window(30, end_date)
+
+    params = {'since': since, 'until': until}
+    df, df2 = await asyncio.gather(fetch(WEIGHT_SQL, params), fetch(BODY_FAT_SQL, params))
+    if not df.collect_schema():
+        logger.warning("query failed for body composition, returning no data...end_date=%s", end_date)
+        return respond(pl.DataFrame(), arrow)
     df = df.rename({'qty':'weight'})
 
-    #---------------------
-    # BF%
-    #---------------------
-
-    # SQL Query
-    sql_query = f"""
-    SELECT *
-    FROM "body_fat_percentage"
-    WHERE time > '{end}' and time <= '{start}'
-    ORDER BY time ASC
-    """
-
-    df2 = db.get_dataframe(sql_query)
+    if not df2.collect_schema():
+        logger.warning("query failed for body fat, returning no data...end_date=%s", end_date)
+        return respond(pl.DataFrame(), arrow)
     df2 = df2.rename({'qty':'bodyFat'})
 
-    df = df.join(df2, on='time', how='left')
-    result = df.drop_nulls().select(['time', 'weight', 'bodyFat']).with_columns(
-        pl.col('time').dt.strftime('%h %e')
-    ).to_dicts()
+    # Weight and body fat are rarely logged at the same instant, so pair each
+    # weight with the nearest body-fat reading within a day.
+    df = df.join_asof(df2, on='time', strategy='nearest', tolerance='1d')
+    result = df.drop_nulls('bodyFat').select(BODY_COLUMNS).collect(engine='streaming')
 
-    return result
+    return respond(result, arrow)